@@ -14,7 +14,10 @@ from src.utils.logger import get_logger
 
 class TaskScheduler:
     """任务调度器"""
-    
+
+    # 错峰时段（小时），frozenset一次构建，定时检查直接复用
+    OFF_PEAK_HOURS = frozenset(Constants.OffPeakConstants.DEFAULT_OFF_PEAK_HOURS)
+
     def __init__(self, task_manager, status_checker, scheduler_config):
         self.task_manager = task_manager
         self.status_checker = status_checker
@@ -280,9 +283,8 @@ class TaskScheduler:
         """错峰时段检查"""
         try:
             current_hour = datetime.now().hour
-            off_peak_hours = [0, 1, 2, 3, 4, 5, 6]  # 配置中获取
-            
-            if current_hour in off_peak_hours:
+
+            if current_hour in self.OFF_PEAK_HOURS:
                 # 检查是否有等待错峰的任务
                 waiting_tasks = self.task_manager.get_tasks_by_status(Constants.TaskStatus.WAITING_OFF_PEAK)
                 
@@ -2,37 +2,179 @@
 任务管理器 - 处理视频生成任务的创建、管理和监控
 """
 
+import bisect
+import os
+import re
+import sys
 import time
 import json
 import csv
-from typing import Dict, Any, Optional, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Any, Iterator, Mapping, Optional, List
 from datetime import datetime, timedelta
 from src.config.constants import Constants
 from src.utils.logger import get_logger
 
+try:
+    import orjson
+except ImportError:  # orjson不可用时退回标准库json
+    orjson = None
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为紧凑UTF-8 bytes，优先使用orjson的C实现"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _json_loads(data: bytes) -> Any:
+    """从bytes反序列化，优先使用orjson的C实现"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+# 提示词中的图片引用前缀（固定值）
+_PROMPT_IMAGE_PREFIX = "[@图1]"
+
+# 自然排序用的数字分段正则，模块加载时编译一次
+_NATURAL_SORT_RE = re.compile(r'(\d+)')
+
+# 支持的图片扩展名tuple，str.endswith可一次性匹配多个后缀
+_IMAGE_EXT_SUFFIXES = tuple(Constants.FileConstants.SUPPORTED_IMAGE_FORMATS)
+
+# journal积累到这个条数后触发一次全量compaction
+_JOURNAL_COMPACT_THRESHOLD = 200
+
+# 批量创建时遇到这些状态码说明整批都会失败（认证/配额问题），没必要继续
+_BATCH_FATAL_STATUS_CODES = frozenset({
+    Constants.HTTPStatus.UNAUTHORIZED,
+    Constants.HTTPStatus.FORBIDDEN,
+    Constants.HTTPStatus.RATE_LIMITED,
+})
+
+def _natural_sort_key(filename: str) -> List:
+    """自然排序的键函数，正确处理文件名中的数字序号"""
+    parts = _NATURAL_SORT_RE.split(os.path.basename(filename))
+    # 数字部分转换为整数比较，非数字部分保持字符串
+    return [int(part) if part.isdigit() else part for part in parts]
+
+# 常见宽高比及其标准值，模块加载时算好，避免每次判定重新构建
+_COMMON_ASPECT_RATIOS = (
+    ("16:9", 16 / 9),
+    ("9:16", 9 / 16),
+    ("1:1", 1.0),
+    ("4:3", 4 / 3),
+    ("3:4", 3 / 4),
+    ("21:9", 21 / 9),
+)
+
+# 按数值升序的查表结构，bisect二分定位后只需比较左右两个邻居
+_SORTED_ASPECT_RATIOS = tuple(sorted(_COMMON_ASPECT_RATIOS, key=lambda item: item[1]))
+_ASPECT_RATIO_VALUES = tuple(value for _, value in _SORTED_ASPECT_RATIOS)
+
+# 任务提交的浏览器模拟请求头模板（只读，x-request-id每次请求单独生成）
+_TASK_SUBMIT_HEADERS = MappingProxyType({
+    'accept': '*/*',
+    'accept-language': 'zh',
+    'content-type': 'application/json',
+    'origin': 'https://www.vidu.cn',
+    'priority': 'u=1, i',
+    'referer': 'https://www.vidu.cn/',
+    'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+    'x-app-version': '-',
+    'x-platform': 'web'
+})
+
+# 状态查询的请求头全部是静态值，直接整表复用
+_TASK_STATUS_HEADERS = MappingProxyType({
+    'accept': '*/*',
+    'accept-language': 'zh,en;q=0.9,zh-CN;q=0.8',
+    'origin': 'https://www.vidu.cn',
+    'priority': 'u=1, i',
+    'referer': 'https://www.vidu.cn/',
+    'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
+})
+
 class TaskManager:
     """视频生成任务管理器"""
-    
+
+    # 错峰时段（小时），frozenset成员测试一次构建处处复用
+    OFF_PEAK_HOURS = frozenset(Constants.OffPeakConstants.DEFAULT_OFF_PEAK_HOURS)
+
     def __init__(self, request_handler, file_manager, storage_paths):
         self.request_handler = request_handler
         self.file_manager = file_manager
         self.storage_paths = storage_paths
         self.logger = get_logger("TASK_MANAGER")
         
-        # 任务存储文件
+        # 任务存储文件：tasks.json为全量快照，journal记录增量更新
         self.tasks_file = storage_paths['cache'] / 'tasks.json'
-        self.tasks = self._load_tasks()
-        
+        self.tasks_journal_file = storage_paths['cache'] / 'tasks.journal.jsonl'
+        self._journal_entries = 0
+
         # 任务ID记录文件
         self.task_ids_file = storage_paths['cache'] / 'task_ids.csv'
+
+        # 启动解析并行化：tasks.json(+journal)与任务ID CSV互不依赖，
+        # 两个文件的IO+解析在线程池里同时进行
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            tasks_future = executor.submit(self._load_tasks)
+            records_future = executor.submit(self._read_task_id_records)
+            self.tasks = tasks_future.result()
+            self._task_id_records_cache: Optional[List[Dict[str, Any]]] = records_future.result()
+
+        # 已下载任务ID缓存，批量下载时用set成员测试替代嵌套字典查找
+        self._downloaded_task_ids = {
+            task_id for task_id, task_info in self.tasks.items()
+            if 'video_path' in task_info
+        }
+
+        # 状态 -> 任务ID集合索引，按状态查询时无需全量扫描
+        self._status_index: Dict[str, set] = {}
+        self._rebuild_status_index()
+
+        # created_at解析结果缓存，datetime对象不能进任务记录（需保持可JSON序列化）
+        self._created_at_cache: Dict[str, datetime] = {}
+
+        # 并发创建任务时保护tasks字典和落盘操作
+        self._tasks_lock = threading.RLock()
+
+        # CSV追加写缓冲：批量创建时积攒记录，合并为一次打开+写入
+        self._pending_id_rows: List[List[Any]] = []
+        self._defer_id_records = False
     
-    def create_video_task(self, image_path: str, prompt: str, use_off_peak: bool = True) -> Dict[str, Any]:
-        """创建视频生成任务"""
+    def create_video_task(self, image_path: str, prompt: str, use_off_peak: bool = True,
+                          upload_cache: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """创建视频生成任务
+
+        upload_cache: 批量创建时共享的上传结果缓存，同一张图片只走一次
+        预处理+三步上传流程。
+        """
         try:
             self.logger.info(f"创建视频生成任务 - 图片: {image_path}, 提示词: {prompt}")
-            
-            # 1. 上传图片
-            upload_result = self.file_manager.upload_image(image_path)
+
+            # 1. 上传图片（批量场景下相同图片直接复用缓存的上传结果）
+            cache_key = os.path.abspath(image_path) if upload_cache is not None else None
+            upload_result = upload_cache.get(cache_key) if cache_key is not None else None
+
+            if upload_result is None:
+                upload_result = self.file_manager.upload_image(image_path)
+                if cache_key is not None and upload_result['success']:
+                    upload_cache[cache_key] = upload_result
+            else:
+                self.logger.info(f"命中上传缓存，复用图片上传结果: {image_path}")
+
             if not upload_result['success']:
                 return {
                     'success': False,
@@ -83,11 +225,12 @@ class TaskManager:
                 'api_response': create_result.get('api_response', {})
             }
             
-            self.tasks[create_result['task_id']] = task_info
-            self._save_tasks()
-            
-            # 记录任务ID到指定文件，方便后续查看
-            self._save_task_id_record(create_result['task_id'], task_info)
+            with self._tasks_lock:
+                self.tasks[create_result['task_id']] = task_info
+                self._save_tasks(create_result['task_id'])
+
+                # 记录任务ID到指定文件，方便后续查看
+                self._save_task_id_record(create_result['task_id'], task_info)
             
             self.logger.info(f"任务创建成功 - Task ID: {create_result['task_id']}")
             
@@ -109,8 +252,12 @@ class TaskManager:
         """提交任务到vidu平台 - 按照真实API格式"""
         try:
             # 构建复杂的任务提交数据，按照真实API格式
-            prompt_text = f"[@图1]{task_data['prompt']}"
-            
+            prompt_text = f"{_PROMPT_IMAGE_PREFIX}{task_data['prompt']}"
+
+            # 宽高各取一次，后面selected_region和aspect_ratio共用
+            image_width = task_data.get('image_width', 720)
+            image_height = task_data.get('image_height', 1122)
+
             # 构建prompts数组
             prompts = [
                 {
@@ -124,19 +271,16 @@ class TaskManager:
                     "selected_region": {
                         "top_left": {"x": 0, "y": 0},
                         "bottom_right": {
-                            "x": task_data.get('image_width', 720),
-                            "y": task_data.get('image_height', 1122)
+                            "x": image_width,
+                            "y": image_height
                         }
                     },
                     "name": "图1"
                 }
             ]
-            
+
             # 计算 aspect_ratio
-            aspect_ratio = self.get_aspect_ratio_string(
-                task_data.get('image_width'),
-                task_data.get('image_height')
-            )
+            aspect_ratio = self.get_aspect_ratio_string(image_width, image_height)
             # 构建请求payload
             payload = {
                 "input": {
@@ -158,26 +302,10 @@ class TaskManager:
                 }
             }
             
-            # 构建完整的浏览器模拟请求头
-            headers = {
-                'accept': '*/*',
-                'accept-language': 'zh',
-                'content-type': 'application/json',
-                'origin': 'https://www.vidu.cn',
-                'priority': 'u=1, i',
-                'referer': 'https://www.vidu.cn/',
-                'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"macOS"',
-                'sec-fetch-dest': 'empty',
-                'sec-fetch-mode': 'cors',
-                'sec-fetch-site': 'same-site',
-                'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
-                'x-app-version': '-',
-                'x-platform': 'web',
-                'x-request-id': f"task-request-{int(time.time() * 1000)}"
-            }
-            
+            # 基于只读模板构建请求头，只有x-request-id需要逐次生成
+            headers = dict(_TASK_SUBMIT_HEADERS)
+            headers['x-request-id'] = f"task-request-{int(time.time() * 1000)}"
+
             self.logger.info(f"提交任务到vidu平台: {prompt_text}")
             
             # 提交任务
@@ -202,7 +330,8 @@ class TaskManager:
                 }
             else:
                 error_msg = f"任务提交失败，状态码: {response.status_code}"
-                if response.text:
+                # 用content避免提前触发整个响应体的bytes->str解码
+                if response.content and response.headers.get('content-type', '').startswith('application/json'):
                     try:
                         error_data = response.json()
                         error_msg = error_data.get('message', error_msg)
@@ -226,30 +355,16 @@ class TaskManager:
     def check_task_status(self, task_id: str) -> Dict[str, Any]:
         """检查任务状态 - 按照真实API格式"""
         try:
-            # 构建查询参数和请求头
+            # 构建查询参数，请求头全静态直接复用模板
             params = {'id': task_id}
-            headers = {
-                'accept': '*/*',
-                'accept-language': 'zh,en;q=0.9,zh-CN;q=0.8',
-                'origin': 'https://www.vidu.cn',
-                'priority': 'u=1, i',
-                'referer': 'https://www.vidu.cn/',
-                'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"macOS"',
-                'sec-fetch-dest': 'empty',
-                'sec-fetch-mode': 'cors',
-                'sec-fetch-site': 'same-site',
-                'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
-            }
-            
+
             self.logger.info(f"查询任务状态: {task_id}")
-            
+
             # 发起状态查询请求
             response = self.request_handler.get(
                 Constants.APIEndpoints.TASK_STATUS,
                 params=params,
-                headers=headers
+                headers=_TASK_STATUS_HEADERS
             )
             
             if response.status_code == 200:
@@ -273,8 +388,8 @@ class TaskManager:
                     
                     if internal_status == Constants.TaskStatus.COMPLETED:
                         self.tasks[task_id]['completed_at'] = datetime.now().isoformat()
-                    
-                    self._save_tasks()
+
+                    self._save_tasks(task_id)
                 
                 self.logger.info(f"任务 {task_id} 状态: {api_state} -> {internal_status}")
                 
@@ -291,7 +406,7 @@ class TaskManager:
                 }
             else:
                 error_msg = f"状态查询失败，状态码: {response.status_code}"
-                if response.text:
+                if response.content and response.headers.get('content-type', '').startswith('application/json'):
                     try:
                         error_data = response.json()
                         error_msg = error_data.get('message', error_msg)
@@ -365,7 +480,8 @@ class TaskManager:
                 # 更新任务信息
                 task_info['downloaded_at'] = datetime.now().isoformat()
                 task_info['video_path'] = download_result['video_path']
-                self._save_tasks()
+                self._downloaded_task_ids.add(task_id)
+                self._save_tasks(task_id)
                 
                 self.logger.info(f"视频下载成功 - Task ID: {task_id}")
             
@@ -378,89 +494,102 @@ class TaskManager:
                 'error': f'下载异常: {str(e)}'
             }
 
+    def _fetch_history_page(self, page: int, page_size: int) -> Dict[str, Any]:
+        """获取单页历史任务"""
+        # 多个types参数需要重复出现在query string中，dict参数表达不了，直接拼URL
+        types_params = '&'.join([f'types={task_type}' for task_type in Constants.HistoryTasksConfig.TASK_TYPES])
+        base_params = f"pager.page={page}&pager.pagesz={page_size}&scenes="
+        full_params_str = f"{base_params}&{types_params}"
+
+        self.logger.info(f"获取第 {page + 1} 页历史任务")
+
+        # 发起请求
+        url = f"{Constants.APIEndpoints.TASKS_HISTORY_ME}?{full_params_str}"
+        response = self.request_handler.get(
+            url,
+            headers=Constants.HistoryTasksConfig.DEFAULT_HEADERS
+        )
+
+        if response.status_code == 200:
+            history_data = response.json()
+            return {
+                'success': True,
+                'page': page,
+                'tasks': history_data.get('tasks', []),
+                'total': history_data.get('total', 0)
+            }
+
+        error_msg = f"历史任务查询失败，状态码: {response.status_code}"
+        if response.content and response.headers.get('content-type', '').startswith('application/json'):
+            try:
+                error_data = response.json()
+                error_msg = error_data.get('message', error_msg)
+            except:
+                pass
+
+        self.logger.error(error_msg)
+        return {
+            'success': False,
+            'error': error_msg,
+            'status_code': response.status_code
+        }
+
     def get_tasks_history_batch(self, page: int = 0, page_size: int = 20, max_pages: int = 10) -> Dict[str, Any]:
-        """批量获取历史任务 - 支持分页获取"""
+        """批量获取历史任务 - 首页确定总量后并发获取剩余页"""
         try:
-            all_tasks = []
-            total_fetched = 0
-            current_page = page
-            
             self.logger.info(f"开始批量获取历史任务，起始页: {page}")
-            
-            while current_page < max_pages:
-                # 构建查询参数
-                params = {
-                    'pager.page': current_page,
-                    'pager.pagesz': page_size,
-                    'scenes': '',  # 空字符串表示所有场景
+
+            # 先获取首页，根据total决定还需要哪些页
+            first_result = self._fetch_history_page(page, page_size)
+            if not first_result['success']:
+                return first_result
+
+            all_tasks = list(first_result['tasks'])
+            total_count = first_result['total']
+
+            if not all_tasks:
+                self.logger.info("当前页无任务数据，停止分页查询")
+                return {
+                    'success': True,
+                    'total_tasks': 0,
+                    'tasks': [],
+                    'pages_fetched': 1
                 }
-                
-                # 添加所有支持的任务类型
-                for task_type in Constants.HistoryTasksConfig.TASK_TYPES:
-                    params[f'types'] = task_type  # 注意：这样会覆盖，需要用特殊处理
-                
-                # 特殊处理多个types参数 - 构建URL参数字符串
-                types_params = '&'.join([f'types={task_type}' for task_type in Constants.HistoryTasksConfig.TASK_TYPES])
-                base_params = f"pager.page={current_page}&pager.pagesz={page_size}&scenes="
-                full_params_str = f"{base_params}&{types_params}"
-                
-                self.logger.info(f"获取第 {current_page + 1} 页历史任务")
-                
-                # 发起请求
-                url = f"{Constants.APIEndpoints.TASKS_HISTORY_ME}?{full_params_str}"
-                response = self.request_handler.get(
-                    url,
-                    headers=Constants.HistoryTasksConfig.DEFAULT_HEADERS
-                )
-                
-                if response.status_code == 200:
-                    history_data = response.json()
-                    
-                    # 解析响应数据
-                    page_tasks = history_data.get('tasks', [])
-                    total_count = history_data.get('total', 0)
-                    
-                    if not page_tasks:
-                        self.logger.info("当前页无任务数据，停止分页查询")
-                        break
-                    
-                    all_tasks.extend(page_tasks)
-                    total_fetched += len(page_tasks)
-                    
-                    self.logger.info(f"第 {current_page + 1} 页获取到 {len(page_tasks)} 个任务")
-                    
-                    # 检查是否还有更多页
-                    if len(page_tasks) < page_size or total_fetched >= total_count:
-                        self.logger.info("已获取所有可用的历史任务")
-                        break
-                        
-                else:
-                    error_msg = f"历史任务查询失败，状态码: {response.status_code}"
-                    if response.text:
-                        try:
-                            error_data = response.json()
-                            error_msg = error_data.get('message', error_msg)
-                        except:
-                            pass
-                    
-                    self.logger.error(error_msg)
-                    return {
-                        'success': False,
-                        'error': error_msg,
-                        'status_code': response.status_code
-                    }
-                
-                current_page += 1
-            
+
+            self.logger.info(f"第 {page + 1} 页获取到 {len(all_tasks)} 个任务")
+
+            # 计算剩余页（受max_pages和total双重限制），页之间相互独立，可并发获取
+            remaining_pages = [
+                p for p in range(page + 1, max_pages)
+                if p * page_size < total_count
+            ]
+
+            pages_fetched = 1
+            if len(all_tasks) >= page_size and remaining_pages:
+                with ThreadPoolExecutor(max_workers=min(4, len(remaining_pages))) as executor:
+                    page_results = list(executor.map(
+                        lambda p: self._fetch_history_page(p, page_size),
+                        remaining_pages
+                    ))
+
+                for page_result in page_results:
+                    if not page_result['success']:
+                        return page_result
+
+                    all_tasks.extend(page_result['tasks'])
+                    pages_fetched += 1
+                    self.logger.info(f"第 {page_result['page'] + 1} 页获取到 {len(page_result['tasks'])} 个任务")
+
+            total_fetched = len(all_tasks)
             self.logger.info(f"批量历史任务获取完成，共获取 {total_fetched} 个任务")
-            
+
             return {
                 'success': True,
                 'total_tasks': total_fetched,
                 'tasks': all_tasks,
-                'pages_fetched': current_page - page
+                'pages_fetched': pages_fetched
             }
-            
+
         except Exception as e:
             self.logger.error(f"批量获取历史任务异常: {str(e)}")
             return {
@@ -471,9 +600,12 @@ class TaskManager:
     def match_local_tasks_with_remote(self, remote_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """匹配本地任务ID与远程历史任务"""
         try:
-            # 获取本地任务ID记录
-            local_task_records = self.get_task_ids_from_file()
-            local_task_ids = {record['task_id'] for record in local_task_records if record.get('task_id')}
+            # 获取本地任务ID记录（流式读取，直接聚合成set）
+            local_task_ids = {
+                record['task_id']
+                for record in self.iter_task_id_records()
+                if record.get('task_id')
+            }
             
             # 创建远程任务字典 (task_id -> task_data)
             remote_task_dict = {task['id']: task for task in remote_tasks}
@@ -566,7 +698,7 @@ class TaskManager:
                 
                 try:
                     # 检查是否已经下载过
-                    if task_id in self.tasks and 'video_path' in self.tasks[task_id]:
+                    if task_id in self._downloaded_task_ids:
                         self.logger.info(f"任务 {task_id} 的视频已存在，跳过下载")
                         download_results['download_details'].append({
                             'task_id': task_id,
@@ -622,8 +754,9 @@ class TaskManager:
                             'creation_id': creation_id,
                             'status': Constants.TaskStatus.COMPLETED
                         })
-                        
-                        self._save_tasks()
+                        self._downloaded_task_ids.add(task_id)
+
+                        self._save_tasks(task_id)
                         
                         download_results['successful_downloads'] += 1
                         download_results['download_details'].append({
@@ -672,76 +805,64 @@ class TaskManager:
                 'error': f'历史视频下载异常: {str(e)}'
             }
 
+    def _parse_history_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """解析单个历史任务的基本信息"""
+        return {
+            'id': task['id'],
+            'state': task.get('state', ''),
+            'type': task.get('type', ''),
+            'scene': task.get('scene', ''),
+            'created_at': task.get('created_at', ''),
+            'err_code': task.get('err_code', ''),
+            'input': task.get('input', {}),
+            'settings': task.get('settings', {}),
+            'creations': task.get('creations', [])
+        }
+
+    def _build_downloadable_info(self, parsed_task: Dict[str, Any], creation: Dict[str, Any]) -> Dict[str, Any]:
+        """构建可下载视频的描述信息"""
+        return {
+            'task_id': parsed_task['id'],
+            'task_data': parsed_task,
+            'creation': creation,
+            'download_url': (creation.get('nomark_uri') or
+                             creation.get('download_uri') or
+                             creation.get('uri')),
+            'creation_id': creation.get('id'),
+            'video_duration': creation.get('duration', 0),
+            'resolution': creation.get('resolution', {}),
+            'file_type': creation.get('type', 'video')
+        }
+
     def _parse_history_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
         """解析批量历史任务接口返回数据"""
         try:
+            raw_tasks = response_data.get('tasks', [])
+
+            # 用comprehension一次性构建各列表，避免逐条append的解释器开销
+            parse_errors = ["任务缺少ID字段" for task in raw_tasks if not task.get('id')]
+            tasks = [self._parse_history_task(task) for task in raw_tasks if task.get('id')]
+            task_states = {task['id']: task['state'] for task in tasks}
+            completed_tasks = [task for task in tasks if task['state'] == 'success']
+            downloadable_tasks = [
+                self._build_downloadable_info(task, creation)
+                for task in completed_tasks
+                for creation in task['creations']
+                if (creation.get('download_uri') or
+                    creation.get('nomark_uri') or
+                    creation.get('uri'))
+            ]
+
             parsed_result = {
                 'success': True,
                 'total': response_data.get('total', 0),
-                'tasks': [],
-                'completed_tasks': [],
-                'downloadable_tasks': [],
-                'task_states': {},
-                'parse_errors': []
+                'tasks': tasks,
+                'completed_tasks': completed_tasks,
+                'downloadable_tasks': downloadable_tasks,
+                'task_states': task_states,
+                'parse_errors': parse_errors
             }
-            
-            raw_tasks = response_data.get('tasks', [])
-            
-            for task in raw_tasks:
-                try:
-                    task_id = task.get('id')
-                    if not task_id:
-                        parsed_result['parse_errors'].append("任务缺少ID字段")
-                        continue
-                    
-                    # 基本任务信息
-                    parsed_task = {
-                        'id': task_id,
-                        'state': task.get('state', ''),
-                        'type': task.get('type', ''),
-                        'scene': task.get('scene', ''),
-                        'created_at': task.get('created_at', ''),
-                        'err_code': task.get('err_code', ''),
-                        'input': task.get('input', {}),
-                        'settings': task.get('settings', {}),
-                        'creations': task.get('creations', [])
-                    }
-                    
-                    parsed_result['tasks'].append(parsed_task)
-                    
-                    # 记录任务状态
-                    parsed_result['task_states'][task_id] = parsed_task['state']
-                    
-                    # 检查是否为已完成任务
-                    if parsed_task['state'] == 'success':
-                        parsed_result['completed_tasks'].append(parsed_task)
-                        
-                        # 检查是否有可下载的视频
-                        for creation in parsed_task['creations']:
-                            if (creation.get('download_uri') or 
-                                creation.get('nomark_uri') or 
-                                creation.get('uri')):
-                                
-                                downloadable_info = {
-                                    'task_id': task_id,
-                                    'task_data': parsed_task,
-                                    'creation': creation,
-                                    'download_url': (creation.get('nomark_uri') or 
-                                                   creation.get('download_uri') or 
-                                                   creation.get('uri')),
-                                    'creation_id': creation.get('id'),
-                                    'video_duration': creation.get('duration', 0),
-                                    'resolution': creation.get('resolution', {}),
-                                    'file_type': creation.get('type', 'video')
-                                }
-                                
-                                parsed_result['downloadable_tasks'].append(downloadable_info)
-                                
-                except Exception as e:
-                    error_msg = f"解析单个任务时出错: {str(e)}"
-                    parsed_result['parse_errors'].append(error_msg)
-                    self.logger.warning(error_msg)
-            
+
             self.logger.info(f"历史任务数据解析完成 - 总数: {parsed_result['total']}, "
                            f"解析成功: {len(parsed_result['tasks'])}, "
                            f"已完成: {len(parsed_result['completed_tasks'])}, "
@@ -759,8 +880,9 @@ class TaskManager:
                 'error': f'解析历史任务响应异常: {str(e)}'
             }
 
-    def batch_create_video_tasks(self, images_dir: str, prompts_file: str, 
-                                 use_off_peak: bool = False, task_delay: float = 5.0) -> Dict[str, Any]:
+    def batch_create_video_tasks(self, images_dir: str, prompts_file: str,
+                                 use_off_peak: bool = False, task_delay: float = 5.0,
+                                 max_workers: int = 4) -> Dict[str, Any]:
         """批量创建视频生成任务"""
         try:
             self.logger.info(f"开始批量创建视频任务 - 图片目录: {images_dir}, 提示词文件: {prompts_file}")
@@ -770,15 +892,15 @@ class TaskManager:
             if not validation_result['success']:
                 return validation_result
             
-            # 2. 扫描和排序图片文件
-            images_result = self._scan_and_sort_images(images_dir)
+            # 2. 扫描和排序图片文件（复用验证阶段的Path对象，避免重复stat）
+            images_result = self._scan_and_sort_images(validation_result['images_path'], validated=True)
             if not images_result['success']:
                 return images_result
-            
+
             image_files = images_result['image_files']
-            
+
             # 3. 加载提示词
-            prompts_result = self._load_prompts_from_file(prompts_file)
+            prompts_result = self._load_prompts_from_file(validation_result['prompts_path'], validated=True)
             if not prompts_result['success']:
                 return prompts_result
             
@@ -803,62 +925,105 @@ class TaskManager:
                 'errors': []
             }
             
-            self.logger.info(f"开始批量创建 {len(image_files)} 个视频任务")
-            
-            for i, (image_file, prompt) in enumerate(zip(image_files, prompts), 1):
-                try:
-                    self.logger.info(f"创建第 {i}/{len(image_files)} 个任务")
-                    self.logger.info(f"图片: {image_file}")
-                    self.logger.info(f"提示词: {prompt[:50]}...")  # 只显示前50个字符
-                    
-                    # 创建单个任务
-                    task_result = self.create_video_task(
-                        image_path=image_file,
-                        prompt=prompt,
-                        use_off_peak=use_off_peak
-                    )
-                    
-                    # 记录结果
-                    task_info = {
-                        'index': i,
-                        'image_file': image_file,
-                        'prompt': prompt,
-                        'success': task_result['success'],
-                        'task_id': task_result.get('task_id', ''),
-                        'error': task_result.get('error', '')
-                    }
-                    
-                    batch_results['task_results'].append(task_info)
-                    
-                    if task_result['success']:
-                        batch_results['successful_tasks'] += 1
-                        batch_results['created_task_ids'].append(task_result['task_id'])
-                        self.logger.info(f"✅ 第 {i} 个任务创建成功: {task_result['task_id']}")
-                    else:
-                        batch_results['failed_tasks'] += 1
-                        error_msg = f"第 {i} 个任务创建失败: {task_result['error']}"
-                        batch_results['errors'].append(error_msg)
-                        self.logger.error(error_msg)
-                    
-                    # 任务间延时（最后一个任务不需要延时）
-                    if i < len(image_files):
-                        self.logger.debug(f"等待 {task_delay} 秒后创建下一个任务...")
-                        time.sleep(task_delay)
-                
-                except Exception as e:
-                    error_msg = f"处理第 {i} 个任务时发生异常: {str(e)}"
-                    self.logger.error(error_msg)
-                    
-                    batch_results['failed_tasks'] += 1
-                    batch_results['errors'].append(error_msg)
-                    batch_results['task_results'].append({
-                        'index': i,
-                        'image_file': image_file,
-                        'prompt': prompt,
-                        'success': False,
-                        'task_id': '',
-                        'error': str(e)
-                    })
+            total_count = len(image_files)
+            self.logger.info(f"开始批量创建 {total_count} 个视频任务 (并发数: {max_workers})")
+
+            # 批内共享的上传缓存：重复出现的图片不再重复预处理和上传
+            upload_cache: Dict[str, Dict[str, Any]] = {}
+
+            def _create_one(index: int, image_file: str, prompt: str) -> Dict[str, Any]:
+                # 参数延迟代入，格式化推迟到sink接收消息时才发生
+                self.logger.info("创建第 {}/{} 个任务", index, total_count)
+                self.logger.info("图片: {}", image_file)
+                self.logger.info("提示词: {}...", prompt[:50])  # 只显示前50个字符
+
+                return self.create_video_task(
+                    image_path=image_file,
+                    prompt=prompt,
+                    use_off_peak=use_off_peak,
+                    upload_cache=upload_cache
+                )
+
+            # 批量期间任务ID记录只积攒不落盘，结束后一次性flush
+            self._defer_id_records = True
+
+            try:
+                # 线程池并发创建：上传+提交的网络耗时相互重叠，
+                # 提交节奏仍按task_delay错开，保持对平台友好的请求频率
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = []
+                    for i, (image_file, prompt) in enumerate(zip(image_files, prompts), 1):
+                        futures.append((i, image_file, prompt,
+                                        executor.submit(_create_one, i, image_file, prompt)))
+
+                        if i < total_count and task_delay > 0:
+                            self.logger.debug("等待 {} 秒后创建下一个任务...", task_delay)
+                            time.sleep(task_delay)
+
+                    fatal_error = None
+                    for i, image_file, prompt, future in futures:
+                        if fatal_error is not None and future.cancel():
+                            # 认证/配额错误会让剩余任务全部失败，未启动的直接取消
+                            batch_results['failed_tasks'] += 1
+                            batch_results['task_results'].append({
+                                'index': i,
+                                'image_file': image_file,
+                                'prompt': prompt,
+                                'success': False,
+                                'task_id': '',
+                                'error': f'批量已中止: {fatal_error}'
+                            })
+                            continue
+
+                        try:
+                            task_result = future.result()
+                        except Exception as e:
+                            error_msg = f"处理第 {i} 个任务时发生异常: {str(e)}"
+                            self.logger.error(error_msg)
+
+                            batch_results['failed_tasks'] += 1
+                            batch_results['errors'].append(error_msg)
+                            batch_results['task_results'].append({
+                                'index': i,
+                                'image_file': image_file,
+                                'prompt': prompt,
+                                'success': False,
+                                'task_id': '',
+                                'error': str(e)
+                            })
+                            continue
+
+                        # 记录结果
+                        task_info = {
+                            'index': i,
+                            'image_file': image_file,
+                            'prompt': prompt,
+                            'success': task_result['success'],
+                            'task_id': task_result.get('task_id', ''),
+                            'error': task_result.get('error', '')
+                        }
+
+                        batch_results['task_results'].append(task_info)
+
+                        if task_result['success']:
+                            batch_results['successful_tasks'] += 1
+                            batch_results['created_task_ids'].append(task_result['task_id'])
+                            self.logger.info("✅ 第 {} 个任务创建成功: {}", i, task_result['task_id'])
+                        else:
+                            batch_results['failed_tasks'] += 1
+                            error_msg = f"第 {i} 个任务创建失败: {task_result['error']}"
+                            batch_results['errors'].append(error_msg)
+                            self.logger.error(error_msg)
+
+                            # 认证/配额类错误：中止整批而不是硬跑完N个失败
+                            if (fatal_error is None and
+                                    task_result.get('status_code') in _BATCH_FATAL_STATUS_CODES):
+                                fatal_error = task_result['error']
+                                self.logger.error(f"检测到认证/配额类错误，中止剩余批量任务: {fatal_error}")
+                                batch_results['errors'].append(f'批量提前中止: {fatal_error}')
+            finally:
+                self._defer_id_records = False
+                self._flush_task_id_records()
             
             # 6. 汇总结果
             success_rate = (batch_results['successful_tasks'] / batch_results['total_tasks']) * 100
@@ -882,29 +1047,30 @@ class TaskManager:
                 'error': f'批量创建视频任务异常: {str(e)}'
             }
 
-    def _scan_and_sort_images(self, images_dir: str) -> Dict[str, Any]:
-        """扫描和自然排序图片文件"""
+    def _scan_and_sort_images(self, images_dir, validated: bool = False) -> Dict[str, Any]:
+        """扫描和自然排序图片文件
+
+        validated=True表示调用方已经验证过目录存在，跳过重复的stat。
+        """
         try:
-            import os
-            import re
             from pathlib import Path
-            
-            images_path = Path(images_dir)
-            if not images_path.exists():
+
+            images_path = images_dir if isinstance(images_dir, Path) else Path(images_dir)
+            if not validated and not images_path.exists():
                 return {
                     'success': False,
                     'error': f'图片目录不存在: {images_dir}'
                 }
             
             # 获取所有图片文件
-            image_extensions = Constants.FileConstants.SUPPORTED_IMAGE_FORMATS
+            # os.scandir复用readdir带回的文件类型信息，免去每个文件一次额外stat
             image_files = []
-            
-            for file_path in images_path.iterdir():
-                if file_path.is_file():
-                    # 检查文件扩展名
-                    if any(file_path.name.lower().endswith(ext) for ext in image_extensions):
-                        image_files.append(str(file_path.absolute()))
+
+            with os.scandir(images_path) as entries:
+                for entry in entries:
+                    # endswith接收tuple，一次C层调用完成全部后缀匹配
+                    if entry.is_file() and entry.name.lower().endswith(_IMAGE_EXT_SUFFIXES):
+                        image_files.append(os.path.abspath(entry.path))
             
             if not image_files:
                 return {
@@ -912,27 +1078,17 @@ class TaskManager:
                     'error': f'在目录 {images_dir} 中未找到支持的图片文件'
                 }
             
-            # 自然排序（处理数字序号）
-            def natural_sort_key(filename):
-                """自然排序的键函数，正确处理数字"""
-                base_name = os.path.basename(filename)
-                # 提取文件名中的数字部分
-                parts = re.split(r'(\d+)', base_name)
-                # 将数字部分转换为整数，非数字部分保持字符串
-                result = []
-                for part in parts:
-                    if part.isdigit():
-                        result.append(int(part))
-                    else:
-                        result.append(part)
-                return result
-            
-            # 按自然顺序排序
-            image_files.sort(key=natural_sort_key)
+            # 按自然顺序排序（预编译正则 + comprehension构建排序键）
+            image_files.sort(key=_natural_sort_key)
             
             self.logger.info(f"扫描到 {len(image_files)} 个图片文件")
             for i, image_file in enumerate(image_files, 1):
-                self.logger.debug(f"  {i}. {os.path.basename(image_file)}")
+                # lazy模式下basename只在DEBUG级别真正落盘时才计算
+                self.logger.opt(lazy=True).debug(
+                    "  {}. {}",
+                    lambda i=i: i,
+                    lambda f=image_file: os.path.basename(f)
+                )
             
             return {
                 'success': True,
@@ -947,32 +1103,35 @@ class TaskManager:
                 'error': f'扫描图片文件异常: {str(e)}'
             }
 
-    def _load_prompts_from_file(self, prompts_file: str) -> Dict[str, Any]:
-        """从文件加载提示词"""
+    def _load_prompts_from_file(self, prompts_file, validated: bool = False) -> Dict[str, Any]:
+        """从文件加载提示词
+
+        validated=True表示调用方已经验证过文件存在，跳过重复的stat。
+        """
         try:
             from pathlib import Path
-            
-            prompts_path = Path(prompts_file)
-            if not prompts_path.exists():
+
+            prompts_path = prompts_file if isinstance(prompts_file, Path) else Path(prompts_file)
+            if not validated and not prompts_path.exists():
                 return {
                     'success': False,
                     'error': f'提示词文件不存在: {prompts_file}'
                 }
             
-            # 读取文件内容
+            # 逐行流式读取，避免把整个文件读成一个大字符串后再切分
+            prompts = []
             with open(prompts_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            if not content:
-                return {
-                    'success': False,
-                    'error': f'提示词文件为空: {prompts_file}'
-                }
-            
-            # 按行分割提示词
-            prompts = [line.strip() for line in content.split('\n') if line.strip()]
-            
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        prompts.append(line)
+
             if not prompts:
+                if prompts_path.stat().st_size == 0:
+                    return {
+                        'success': False,
+                        'error': f'提示词文件为空: {prompts_file}'
+                    }
                 return {
                     'success': False,
                     'error': f'提示词文件中没有有效内容: {prompts_file}'
@@ -980,8 +1139,11 @@ class TaskManager:
             
             self.logger.info(f"从文件加载到 {len(prompts)} 个提示词")
             for i, prompt in enumerate(prompts, 1):
-                preview = prompt[:30] + '...' if len(prompt) > 30 else prompt
-                self.logger.debug(f"  {i}. {preview}")
+                self.logger.opt(lazy=True).debug(
+                    "  {}. {}",
+                    lambda i=i: i,
+                    lambda p=prompt: p[:30] + '...' if len(p) > 30 else p
+                )
             
             return {
                 'success': True,
@@ -1044,7 +1206,10 @@ class TaskManager:
             return {
                 'success': True,
                 'images_dir': str(images_path.absolute()),
-                'prompts_file': str(prompts_path.absolute())
+                'prompts_file': str(prompts_path.absolute()),
+                # Path对象供后续步骤复用，避免重新构造和stat
+                'images_path': images_path,
+                'prompts_path': prompts_path
             }
             
         except Exception as e:
@@ -1058,28 +1223,46 @@ class TaskManager:
         """获取任务信息"""
         return self.tasks.get(task_id)
     
-    def get_all_tasks(self) -> Dict[str, Any]:
-        """获取所有任务"""
-        return self.tasks.copy()
+    def get_all_tasks(self) -> Mapping[str, Any]:
+        """获取所有任务（只读视图，不复制整个字典）"""
+        return MappingProxyType(self.tasks)
     
+    def get_active_tasks(self) -> Dict[str, Any]:
+        """获取热分片任务（尚未下载完成的任务）"""
+        return {
+            task_id: task_info for task_id, task_info in self.tasks.items()
+            if task_id not in self._downloaded_task_ids
+        }
+
     def get_tasks_by_status(self, status: str) -> Dict[str, Any]:
-        """根据状态获取任务"""
-        filtered_tasks = {}
-        for task_id, task_info in self.tasks.items():
-            if task_info.get('status') == status:
-                filtered_tasks[task_id] = task_info
-        return filtered_tasks
+        """根据状态获取任务（走状态索引，避免全量扫描）"""
+        task_ids = self._status_index.get(status)
+        if not task_ids:
+            return {}
+
+        return {
+            task_id: self.tasks[task_id]
+            for task_id in task_ids if task_id in self.tasks
+        }
     
+    def _get_created_at(self, task_id: str, task_info: Dict[str, Any]) -> datetime:
+        """解析任务创建时间（按任务ID缓存解析结果）"""
+        created_at = self._created_at_cache.get(task_id)
+        if created_at is None:
+            created_at = datetime.fromisoformat(task_info['created_at'])
+            self._created_at_cache[task_id] = created_at
+        return created_at
+
     def get_recent_tasks(self, days: int = 7) -> Dict[str, Any]:
         """获取最近的任务"""
         cutoff_date = datetime.now() - timedelta(days=days)
         recent_tasks = {}
-        
+
         for task_id, task_info in self.tasks.items():
-            created_at = datetime.fromisoformat(task_info['created_at'])
+            created_at = self._get_created_at(task_id, task_info)
             if created_at >= cutoff_date:
                 recent_tasks[task_id] = task_info
-        
+
         return recent_tasks
     
     def _check_off_peak_status(self) -> Dict[str, Any]:
@@ -1087,9 +1270,7 @@ class TaskManager:
         try:
             current_hour = datetime.now().hour
             # 简单的错峰时段判断（后续可以通过API获取）
-            off_peak_hours = [0, 1, 2, 3, 4, 5, 6]  # 凌晨0-6点
-            
-            is_off_peak = current_hour in off_peak_hours
+            is_off_peak = current_hour in self.OFF_PEAK_HOURS
             
             return {
                 'is_available': is_off_peak,
@@ -1116,99 +1297,218 @@ class TaskManager:
         return next_off_peak.isoformat()
     
     def _load_tasks(self) -> Dict[str, Any]:
-        """加载任务数据"""
+        """加载任务数据（tasks.json快照 + journal增量回放）"""
+        tasks: Dict[str, Any] = {}
+
         try:
             if self.tasks_file.exists():
-                with open(self.tasks_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                tasks = _json_loads(self.tasks_file.read_bytes())
         except Exception as e:
             self.logger.error(f"加载任务数据失败: {str(e)}")
-        
-        return {}
+
+        self._journal_entries = 0
+        try:
+            if self.tasks_journal_file.exists():
+                with open(self.tasks_journal_file, 'rb') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        entry = _json_loads(line)
+                        entry_task = entry.get('task')
+                        if entry_task is None:
+                            tasks.pop(entry.get('task_id'), None)
+                        else:
+                            tasks[entry['task_id']] = entry_task
+                        self._journal_entries += 1
+        except Exception as e:
+            self.logger.error(f"回放任务journal失败: {str(e)}")
+
+        return tasks
     
-    def _save_tasks(self) -> None:
-        """保存任务数据"""
+    def _rebuild_status_index(self) -> None:
+        """重建状态索引
+
+        每次落盘时刷新一遍，顺带吸收StatusChecker等外部代码对tasks
+        字典的直接修改；落盘本身就是O(N)，刷新索引不改变复杂度。
+        """
+        index: Dict[str, set] = {}
+        for task_id, task_info in self.tasks.items():
+            status = task_info.get('status', Constants.TaskStatus.PENDING)
+            index.setdefault(status, set()).add(task_id)
+        self._status_index = index
+
+    def _update_status_index(self, task_id: str) -> None:
+        """单任务状态索引更新（避免journal追加路径上O(N)重建）"""
+        for task_ids in self._status_index.values():
+            task_ids.discard(task_id)
+
+        task_info = self.tasks.get(task_id)
+        if task_info is not None:
+            status = task_info.get('status', Constants.TaskStatus.PENDING)
+            self._status_index.setdefault(status, set()).add(task_id)
+
+    def _append_task_journal(self, task_id: str) -> None:
+        """把单个任务的最新记录追加写入journal（一行一条JSON）"""
+        entry = {'task_id': task_id, 'task': self.tasks.get(task_id)}
+        with open(self.tasks_journal_file, 'ab') as f:
+            f.write(_json_dumps(entry) + b'\n')
+        self._journal_entries += 1
+
+    def _compact_tasks(self) -> None:
+        """全量快照写入tasks.json并清空journal（写临时文件后原子替换）
+
+        快照不再缩进：体积更小、写得更快，人工排查用journal的行式
+        记录或jq之类的工具即可。
+        """
+        tmp_file = self.tasks_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(_json_dumps(self.tasks))
+        os.replace(tmp_file, self.tasks_file)
+
+        if self.tasks_journal_file.exists():
+            self.tasks_journal_file.unlink()
+        self._journal_entries = 0
+
+    def _save_tasks(self, task_id: Optional[str] = None) -> None:
+        """保存任务数据
+
+        指定task_id时只追加一条journal记录，积累到阈值后才做一次
+        全量compaction；不指定时直接全量落盘（兼容删除和外部批量修改）。
+        """
         try:
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(self.tasks, f, indent=2, ensure_ascii=False)
+            with self._tasks_lock:
+                if task_id is not None:
+                    self._update_status_index(task_id)
+                    self._append_task_journal(task_id)
+                    if self._journal_entries >= _JOURNAL_COMPACT_THRESHOLD:
+                        self._compact_tasks()
+                else:
+                    self._rebuild_status_index()
+                    self._compact_tasks()
         except Exception as e:
             self.logger.error(f"保存任务数据失败: {str(e)}")
     
     def _save_task_id_record(self, task_id: str, task_info: Dict[str, Any]) -> None:
         """记录任务ID到CSV文件，方便后续查看"""
-        try:
-            # 检查文件是否存在，如果不存在则创建并写入表头
-            file_exists = self.task_ids_file.exists()
-            
-            with open(self.task_ids_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # 如果文件不存在，先写入表头
-                if not file_exists:
-                    writer.writerow(['task_id', 'created_at', 'prompt', 'image_path', 'status', 'use_off_peak'])
-                
-                # 写入任务记录
-                writer.writerow([
-                    task_id,
-                    task_info.get('created_at', ''),
-                    task_info.get('prompt', ''),
-                    task_info.get('image_path', ''),
-                    task_info.get('status', ''),
-                    task_info.get('use_off_peak', False)
-                ])
-                
-            self.logger.info(f"任务ID记录已保存到文件: {task_id}")
-            
-        except Exception as e:
-            self.logger.error(f"保存任务ID记录失败: {str(e)}")
+        with self._tasks_lock:
+            self._pending_id_rows.append([
+                task_id,
+                task_info.get('created_at', ''),
+                task_info.get('prompt', ''),
+                task_info.get('image_path', ''),
+                task_info.get('status', ''),
+                task_info.get('use_off_peak', False)
+            ])
+
+            # 批量模式下先积攒，由批量流程结束时统一落盘
+            if not self._defer_id_records:
+                self._flush_task_id_records()
+
+    def _flush_task_id_records(self) -> None:
+        """把缓冲的任务ID记录一次性追加写入CSV文件"""
+        with self._tasks_lock:
+            if not self._pending_id_rows:
+                return
+
+            rows = self._pending_id_rows
+            self._pending_id_rows = []
+
+            try:
+                # 检查文件是否存在，如果不存在则创建并写入表头
+                file_exists = self.task_ids_file.exists()
+
+                with open(self.task_ids_file, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+
+                    # 如果文件不存在，先写入表头
+                    if not file_exists:
+                        writer.writerow(['task_id', 'created_at', 'prompt', 'image_path', 'status', 'use_off_peak'])
+
+                    # 一次writerows写入全部缓冲记录
+                    writer.writerows(rows)
+
+                # 文件追加了新内容，启动时预热的缓存作废，下次读取时重建
+                self._task_id_records_cache = None
+
+                self.logger.info(f"任务ID记录已保存到文件: {len(rows)} 条")
+
+            except Exception as e:
+                self.logger.error(f"保存任务ID记录失败: {str(e)}")
     
-    def get_task_ids_from_file(self) -> List[Dict[str, Any]]:
-        """从CSV文件读取所有任务ID记录"""
+    def _read_task_id_records(self) -> List[Dict[str, Any]]:
+        """从CSV文件读取全部任务ID记录"""
         try:
             if not self.task_ids_file.exists():
                 return []
-            
-            task_records = []
+
+            with open(self.task_ids_file, 'r', encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+
+        except Exception as e:
+            self.logger.error(f"读取任务ID记录失败: {str(e)}")
+            return []
+
+    def iter_task_id_records(self) -> Iterator[Dict[str, Any]]:
+        """逐条产出任务ID记录（命中内存缓存时不再碰文件）"""
+        if self._task_id_records_cache is not None:
+            yield from self._task_id_records_cache
+            return
+
+        try:
+            if not self.task_ids_file.exists():
+                return
+
             with open(self.task_ids_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row in reader:
-                    task_records.append(row)
-            
-            self.logger.info(f"从文件读取到 {len(task_records)} 个任务ID记录")
-            return task_records
-            
+                    yield row
+
         except Exception as e:
             self.logger.error(f"读取任务ID记录失败: {str(e)}")
-            return []
+
+    def get_task_ids_from_file(self) -> List[Dict[str, Any]]:
+        """读取所有任务ID记录（优先使用启动时预热的缓存）"""
+        if self._task_id_records_cache is None:
+            self._task_id_records_cache = self._read_task_id_records()
+
+        task_records = list(self._task_id_records_cache)
+        self.logger.info(f"从文件读取到 {len(task_records)} 个任务ID记录")
+        return task_records
     
     def show_task_ids_summary(self) -> None:
         """显示任务ID记录摘要信息"""
         try:
             records = self.get_task_ids_from_file()
-            
+
             if not records:
                 print("📋 暂无任务ID记录")
                 return
-            
-            print(f"\n📋 任务ID记录摘要 (共 {len(records)} 个任务):")
-            print("=" * 80)
-            print(f"{'任务ID':<20} {'创建时间':<20} {'状态':<10} {'提示词':<30}")
-            print("-" * 80)
-            
+
+            # 先拼好整段输出，一次write落到stdout，避免逐行print的flush开销
+            lines = [
+                f"\n📋 任务ID记录摘要 (共 {len(records)} 个任务):",
+                "=" * 80,
+                f"{'任务ID':<20} {'创建时间':<20} {'状态':<10} {'提示词':<30}",
+                "-" * 80,
+            ]
+
             for record in records[-10:]:  # 显示最近10个任务
                 task_id = record.get('task_id', '')[:18]
                 created_at = record.get('created_at', '')[:19]
                 status = record.get('status', '')
                 prompt = record.get('prompt', '')[:28]
-                
-                print(f"{task_id:<20} {created_at:<20} {status:<10} {prompt:<30}")
-            
+
+                lines.append(f"{task_id:<20} {created_at:<20} {status:<10} {prompt:<30}")
+
             if len(records) > 10:
-                print(f"... 还有 {len(records) - 10} 个任务")
-            
-            print("=" * 80)
-            print(f"💡 完整记录文件位置: {self.task_ids_file}")
-            
+                lines.append(f"... 还有 {len(records) - 10} 个任务")
+
+            lines.append("=" * 80)
+            lines.append(f"💡 完整记录文件位置: {self.task_ids_file}")
+
+            sys.stdout.write('\n'.join(lines) + '\n')
+
         except Exception as e:
             self.logger.error(f"显示任务ID摘要失败: {str(e)}")
     
@@ -1219,12 +1519,14 @@ class TaskManager:
         
         tasks_to_remove = []
         for task_id, task_info in self.tasks.items():
-            created_at = datetime.fromisoformat(task_info['created_at'])
+            created_at = self._get_created_at(task_id, task_info)
             if created_at < cutoff_date:
                 tasks_to_remove.append(task_id)
-        
+
         for task_id in tasks_to_remove:
             del self.tasks[task_id]
+            self._downloaded_task_ids.discard(task_id)
+            self._created_at_cache.pop(task_id, None)
             cleaned_count += 1
         
         if cleaned_count > 0:
@@ -1240,19 +1542,14 @@ class TaskManager:
                 self.logger.warning("图片宽高缺失，aspect_ratio 默认16:9")
                 return "16:9"
             ratio = width / height
-            # 常见比例及其标准值
-            common_ratios = {
-                "16:9": 16/9,
-                "9:16": 9/16,
-                "1:1": 1.0,
-                "4:3": 4/3,
-                "3:4": 3/4,
-                "21:9": 21/9
-            }
             tolerance = 0.01  # 1% 容差
-            for k, v in common_ratios.items():
-                if abs(ratio - v) < tolerance:
-                    return k
+            # 二分定位后只检查相邻的两个标准比例，替代全表线性扫描
+            pos = bisect.bisect_left(_ASPECT_RATIO_VALUES, ratio)
+            for idx in (pos - 1, pos):
+                if 0 <= idx < len(_SORTED_ASPECT_RATIOS):
+                    label, value = _SORTED_ASPECT_RATIOS[idx]
+                    if abs(ratio - value) < tolerance:
+                        return label
             # 未匹配到常见比例，返回原始宽高
             return f"{width}:{height}"
         except Exception as e:
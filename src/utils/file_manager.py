@@ -4,14 +4,63 @@
 
 import os
 import time
+import mmap
+import queue
+import shutil
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Any, Optional, List
 from PIL import Image
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from src.config.constants import Constants
 from src.utils.logger import get_logger
 
+# 热路径常量一次绑定到模块级，免去每次调用的链式属性查找；
+# frozenset让格式校验的成员判断更快
+_SUPPORTED_IMAGE_FORMATS = frozenset(Constants.FileConstants.SUPPORTED_IMAGE_FORMATS)
+_CONTENT_TYPE_MAPPING = Constants.FileConstants.CONTENT_TYPE_MAPPING
+
+# 各支持格式的文件头魔数（值为PIL格式名），前12字节即可判别
+_IMAGE_MAGIC_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'BM', 'BMP'),
+)
+
+def _sniff_image_format(header: bytes) -> Optional[str]:
+    """根据文件头魔数判别图片格式，无法识别返回None"""
+    for magic, image_format in _IMAGE_MAGIC_SIGNATURES:
+        if header.startswith(magic):
+            return image_format
+    # WEBP是RIFF容器：RIFF<size>WEBP
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+# 上传各步骤的固定请求头，冻结成模板复用，不在每次调用里重建dict；
+# 元数据上传和完成确认用的是同一组头
+_UPLOAD_JSON_HEADERS = MappingProxyType({
+    'Accept': '*/*',
+    'Accept-Language': 'zh',
+    'Content-Type': 'application/json',
+    'Origin': 'https://www.vidu.cn',
+    'Referer': 'https://www.vidu.cn/',
+    'X-App-Version': '-',
+    'X-Platform': 'web'
+})
+
+_UPLOAD_BINARY_HEADERS = MappingProxyType({
+    'Accept': '*/*',
+    'Accept-Language': 'zh,en;q=0.9,zh-CN;q=0.8',
+    'Origin': 'https://www.vidu.cn',
+    'Referer': 'https://www.vidu.cn/'
+})
+
 class FileManager:
     """文件管理器"""
     
@@ -19,13 +68,31 @@ class FileManager:
         self.request_handler = request_handler
         self.storage_paths = storage_paths
         self.logger = get_logger("FILE_MANAGER")
-        
+
+        # 直连外部host（预签名URL、视频CDN）的会话：
+        # 连接池+keep-alive，同一host多次请求免去重复DNS/TLS握手
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+            )
+        )
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
         # 确保存储目录存在
         for path in storage_paths.values():
             path.mkdir(parents=True, exist_ok=True)
     
-    def prepare_image(self, image_path: str) -> Dict[str, Any]:
-        """预处理图片"""
+    def prepare_image(self, image_path: str, compute_hash: bool = True) -> Dict[str, Any]:
+        """预处理图片
+
+        compute_hash=False时跳过哈希计算（上传流程会在后台线程并行计算）。
+        """
         try:
             image_path = Path(image_path)
             if not image_path.exists():
@@ -35,7 +102,8 @@ class FileManager:
                 }
             
             # 验证图片格式
-            if image_path.suffix.lower() not in Constants.FileConstants.SUPPORTED_IMAGE_FORMATS:
+            suffix = image_path.suffix.lower()
+            if suffix not in _SUPPORTED_IMAGE_FORMATS:
                 return {
                     'success': False,
                     'error': f'不支持的图片格式: {image_path.suffix}'
@@ -49,15 +117,30 @@ class FileManager:
                     'error': f'图片文件过大: {file_size} bytes'
                 }
             
-            # 处理图片
-            processed_path = self._process_image(image_path)
-            
+            # 读12字节魔数预判格式：内容不对的文件在进PIL探测前就拒掉，
+            # 合法文件把格式名传下去，省掉PIL逐格式自动探测
+            with open(image_path, 'rb') as f:
+                magic_header = f.read(12)
+            detected_format = _sniff_image_format(magic_header)
+            if detected_format is None:
+                return {
+                    'success': False,
+                    'error': f'图片文件头无法识别: {image_path.name}'
+                }
+
+            # 处理图片（元数据随处理结果一并返回，避免重复解码）
+            processed = self._process_image(image_path, detected_format)
+            processed_path = processed['processed_path']
+
             return {
                 'success': True,
                 'original_path': str(image_path),
                 'processed_path': str(processed_path),
-                'file_size': processed_path.stat().st_size,
-                'image_hash': self._calculate_file_hash(processed_path)
+                'file_size': processed['file_size'],
+                'image_width': processed['width'],
+                'image_height': processed['height'],
+                'content_type': processed['content_type'],
+                'image_hash': self._calculate_file_hash(processed_path) if compute_hash else None
             }
             
         except Exception as e:
@@ -70,19 +153,30 @@ class FileManager:
     def upload_image(self, image_path: str) -> Dict[str, Any]:
         """上传图片到vidu平台 - 三步上传流程"""
         try:
-            # 预处理图片
-            prep_result = self.prepare_image(image_path)
+            # 预处理图片（哈希另行并行计算）
+            prep_result = self.prepare_image(image_path, compute_hash=False)
             if not prep_result['success']:
                 return prep_result
-            
+
             processed_path = Path(prep_result['processed_path'])
-            
-            # 获取图片元数据
-            metadata = self._get_image_metadata(processed_path)
+
+            # 图片元数据在预处理时已经拿到，不再重新打开解码一次
+            metadata = {
+                'width': prep_result['image_width'],
+                'height': prep_result['image_height'],
+                'file_size': prep_result['file_size'],
+                'content_type': prep_result['content_type'],
+                'filename': processed_path.name
+            }
             self.logger.info(f"开始上传图片: {processed_path.name}, 尺寸: {metadata['width']}x{metadata['height']}")
-            
+
             # 步骤1: 上传元数据
-            meta_result = self._upload_metadata(metadata)
+            # 三步上传是严格串行依赖（步骤2要put_url，步骤3要etag），
+            # 唯一可并行的本地工作是文件哈希——与步骤1的网络往返重叠执行
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                hash_future = executor.submit(self._calculate_file_hash, processed_path)
+                meta_result = self._upload_metadata(metadata)
+                image_hash = hash_future.result()
             if not meta_result['success']:
                 # 清理临时文件
                 if processed_path.name.startswith('processed_'):
@@ -128,6 +222,7 @@ class FileManager:
                     'ssupload_id': f"ssupload:?id={upload_id}",
                     'image_width': metadata['width'],
                     'image_height': metadata['height'],
+                    'image_hash': image_hash,
                     'upload_response': finish_result['finish_response']
                 }
             else:
@@ -153,16 +248,43 @@ class FileManager:
             # 修复点：区分完整URL和相对路径，完整URL直接用requests.get
             # 这样可避免 request_handler.get 拼接 base_url 导致 host 错误
             if video_url.startswith('http://') or video_url.startswith('https://'):
-                import requests
-                response = requests.get(video_url, stream=True)
+                response = self._http.get(video_url, stream=True)
             else:
                 response = self.request_handler.get(video_url, stream=True)
             
             if response.status_code == 200:
-                with open(video_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
+                # 生产者/消费者流水线：主线程收网络数据，专门的写盘线程落盘，
+                # 接收和写入重叠进行；1MB块摊薄队列与循环开销
+                chunk_queue = queue.Queue(maxsize=8)
+                write_errors = []
+
+                def _disk_writer():
+                    try:
+                        # 每次落盘都是MB级大块，无缓冲直写省掉BufferedWriter拷贝
+                        with open(video_path, 'wb', buffering=0) as f:
+                            while True:
+                                buf = chunk_queue.get()
+                                if buf is None:
+                                    break
+                                f.write(buf)
+                    except Exception as e:
+                        write_errors.append(e)
+                        # 写盘失败后继续消费到哨兵，避免生产者卡在put上
+                        while chunk_queue.get() is not None:
+                            pass
+
+                writer = threading.Thread(target=_disk_writer, daemon=True)
+                writer.start()
+                try:
+                    # iter_content只产出非空bytes，无需逐块判空
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        chunk_queue.put(chunk)
+                finally:
+                    chunk_queue.put(None)
+                    writer.join()
+
+                if write_errors:
+                    raise write_errors[0]
                 
                 # 验证下载的文件
                 if self._verify_video_file(video_path):
@@ -191,34 +313,71 @@ class FileManager:
                 'error': f'下载异常: {str(e)}'
             }
     
-    def _process_image(self, image_path: Path) -> Path:
-        """处理图片 - 压缩和格式优化"""
+    def _process_image(self, image_path: Path, image_format: Optional[str] = None) -> Dict[str, Any]:
+        """处理图片 - 压缩和格式优化，返回处理后路径及图片元数据
+
+        image_format为魔数预判出的PIL格式名，传入后跳过PIL的自动探测。
+        """
         try:
-            with Image.open(image_path) as img:
+            # 随机后缀防止同一秒内两次处理同名图片互相覆盖
+            # （时间戳粒度是秒，撞了之后cleanup_cache会删错文件）
+            processed_filename = f"processed_{os.urandom(6).hex()}_{image_path.name}"
+            processed_path = self.storage_paths['cache'] / processed_filename
+
+            with Image.open(image_path, formats=[image_format] if image_format else None) as img:
+                max_resolution = Constants.FileConstants.MAX_IMAGE_RESOLUTION
+
+                # 快路径：本身就是尺寸合规的RGB JPEG时直接复制，
+                # 省掉整轮解码+重编码（文件大小上限prepare_image已检查过），
+                # 也避免重复JPEG压缩带来的画质损失
+                if (img.format == 'JPEG' and img.mode == 'RGB'
+                        and img.size[0] <= max_resolution[0]
+                        and img.size[1] <= max_resolution[1]):
+                    width, height = img.size
+                    shutil.copyfile(image_path, processed_path)
+                    self.logger.info(f"图片无需重新编码，直接复制: {processed_path}")
+                    file_ext = processed_path.suffix.lower()
+                    return {
+                        'processed_path': processed_path,
+                        'width': width,
+                        'height': height,
+                        'file_size': processed_path.stat().st_size,
+                        'content_type': _CONTENT_TYPE_MAPPING.get(file_ext, 'image/jpeg'),
+                        'filename': processed_path.name
+                    }
+
+                # JPEG源先draft：libjpeg可按DCT系数以1/2、1/4、1/8比例解码，
+                # 超大图无需全分辨率解码后再缩小
+                if img.format == 'JPEG':
+                    img.draft('RGB', max_resolution)
+
                 # 转换为RGB模式
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
-                
+
                 # 检查分辨率并调整
-                max_resolution = Constants.FileConstants.MAX_IMAGE_RESOLUTION
                 if img.size[0] > max_resolution[0] or img.size[1] > max_resolution[1]:
                     img.thumbnail(max_resolution, Image.Resampling.LANCZOS)
                     self.logger.info(f"图片已调整大小: {img.size}")
                 
-                # 保存处理后的图片
-                processed_filename = f"processed_{int(time.time())}_{image_path.name}"
-                processed_path = self.storage_paths['cache'] / processed_filename
-                
                 # 保存为JPEG格式以减小文件大小
                 img.save(
-                    processed_path, 
-                    'JPEG', 
+                    processed_path,
+                    'JPEG',
                     quality=Constants.FileConstants.DEFAULT_IMAGE_QUALITY,
                     optimize=True
                 )
-                
+
                 self.logger.info(f"图片处理完成: {processed_path}")
-                return processed_path
+                file_ext = processed_path.suffix.lower()
+                return {
+                    'processed_path': processed_path,
+                    'width': img.size[0],
+                    'height': img.size[1],
+                    'file_size': processed_path.stat().st_size,
+                    'content_type': _CONTENT_TYPE_MAPPING.get(file_ext, 'image/jpeg'),
+                    'filename': processed_path.name
+                }
                 
         except Exception as e:
             self.logger.error(f"图片处理失败: {str(e)}")
@@ -231,41 +390,15 @@ class FileManager:
             if video_path.stat().st_size < 1024:  # 小于1KB可能是损坏的
                 return False
             
-            # 检查文件头部
+            # 检查文件头部：MP4的box大小前缀不固定，统一看偏移4处的ftyp标记
             with open(video_path, 'rb') as f:
-                header = f.read(8)
-                # 检查常见视频格式的文件头
-                if header.startswith(b'\x00\x00\x00\x20ftypmp4') or \
-                   header.startswith(b'\x00\x00\x00\x18ftypmp4') or \
-                   header[4:8] == b'ftyp':
-                    return True
-            
-            return False
+                header = f.read(12)
+            return len(header) == 12 and header[4:8] == b'ftyp'
             
         except Exception as e:
             self.logger.error(f"视频文件验证失败: {str(e)}")
             return False
     
-    def _get_image_metadata(self, image_path: Path) -> Dict[str, Any]:
-        """获取图片元数据信息"""
-        try:
-            with Image.open(image_path) as img:
-                width, height = img.size
-                file_size = image_path.stat().st_size
-                file_ext = image_path.suffix.lower()
-                content_type = Constants.FileConstants.CONTENT_TYPE_MAPPING.get(file_ext, 'image/jpeg')
-                
-                return {
-                    'width': width,
-                    'height': height,
-                    'file_size': file_size,
-                    'content_type': content_type,
-                    'filename': image_path.name
-                }
-        except Exception as e:
-            self.logger.error(f"获取图片元数据失败: {str(e)}")
-            raise
-
     def _upload_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """步骤1：上传图片元数据，获取预签名URL"""
         try:
@@ -278,23 +411,13 @@ class FileManager:
                 "scene": "vidu"
             }
             
-            headers = {
-                'Accept': '*/*',
-                'Accept-Language': 'zh',
-                'Content-Type': 'application/json',
-                'Origin': 'https://www.vidu.cn',
-                'Referer': 'https://www.vidu.cn/',
-                'X-App-Version': '-',
-                'X-Platform': 'web'
-            }
-            
             self.logger.info("正在上传图片元数据...")
-            
+
             # 发送元数据请求
             response = self.request_handler.post(
                 Constants.APIEndpoints.FILES_UPLOADS_META,
                 json=payload,
-                headers=headers
+                headers=_UPLOAD_JSON_HEADERS
             )
             
             if response.status_code == 200:
@@ -339,11 +462,8 @@ class FileManager:
         """步骤2：上传图片二进制数据到预签名URL"""
         try:
             headers = {
-                'Accept': '*/*',
-                'Accept-Language': 'zh,en;q=0.9,zh-CN;q=0.8',
+                **_UPLOAD_BINARY_HEADERS,
                 'Content-Type': metadata['content_type'],
-                'Origin': 'https://www.vidu.cn',
-                'Referer': 'https://www.vidu.cn/',
                 'X-Amz-Meta-Image-Height': str(metadata['height']),
                 'X-Amz-Meta-Image-Width': str(metadata['width'])
             }
@@ -353,13 +473,14 @@ class FileManager:
             # 从request_handler获取认证cookie
             auth_cookies = self.request_handler.get_session_cookies()
             
-            # 读取并上传文件数据
-            with open(file_path, 'rb') as file_data:
-                # 使用requests.put但携带认证信息
-                import requests
-                response = requests.put(
+            # 流式上传文件数据：直接把文件对象交给requests，
+            # 按块读取发送，不把整个文件读进内存；
+            # buffering=0走裸fd读取，省掉BufferedReader的一次中间拷贝
+            with open(file_path, 'rb', buffering=0) as file_data:
+                # 使用连接池会话但携带认证信息
+                response = self._http.put(
                     put_url,
-                    data=file_data.read(),
+                    data=file_data,
                     headers=headers,
                     cookies=auth_cookies,  # 传递认证cookie
                     timeout=60
@@ -397,24 +518,14 @@ class FileManager:
                 "id": upload_id
             }
             
-            headers = {
-                'Accept': '*/*',
-                'Accept-Language': 'zh',
-                'Content-Type': 'application/json',
-                'Origin': 'https://www.vidu.cn',
-                'Referer': 'https://www.vidu.cn/',
-                'X-App-Version': '-',
-                'X-Platform': 'web'
-            }
-            
             self.logger.info(f"正在完成上传确认，上传ID: {upload_id}")
-            
+
             # 发送完成确认请求
             finish_url = Constants.APIEndpoints.FILES_UPLOADS_FINISH.format(upload_id=upload_id)
             response = self.request_handler.put(
                 finish_url,
                 json=payload,
-                headers=headers
+                headers=_UPLOAD_JSON_HEADERS
             )
             
             if response.status_code == 200:
@@ -455,11 +566,24 @@ class FileManager:
             }
 
     def _calculate_file_hash(self, file_path: Path) -> str:
-        """计算文件哈希值（ETag格式）"""
-        hasher = hashlib.md5()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hasher.update(chunk)
+        """计算文件哈希值（blake2b，仅用于本地标识/去重）"""
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb', buffering=0) as f:
+            file_size = os.fstat(f.fileno()).st_size
+            if file_size > 64 * 1024:
+                # 大文件整体mmap后一次update喂给C层哈希实现，
+                # 免去Python读循环；刚写完的文件页缓存还是热的
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            else:
+                # 小文件走复用缓冲区的读循环，readinto避免每次read的新bytes分配
+                buf = bytearray(64 * 1024)
+                view = memoryview(buf)
+                while True:
+                    read_size = f.readinto(buf)
+                    if not read_size:
+                        break
+                    hasher.update(view[:read_size])
         return hasher.hexdigest()
     
     def get_storage_info(self) -> Dict[str, Any]:
@@ -467,11 +591,17 @@ class FileManager:
         info = {}
         for name, path in self.storage_paths.items():
             if path.exists():
-                files = list(path.glob('*'))
-                total_size = sum(f.stat().st_size for f in files if f.is_file())
+                # scandir单次遍历目录，DirEntry缓存stat结果，避免glob+逐文件stat
+                file_count = 0
+                total_size = 0
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            file_count += 1
+                            total_size += entry.stat().st_size
                 info[name] = {
                     'path': str(path),
-                    'file_count': len([f for f in files if f.is_file()]),
+                    'file_count': file_count,
                     'total_size': total_size,
                     'total_size_mb': round(total_size / (1024 * 1024), 2)
                 }
@@ -488,16 +618,19 @@ class FileManager:
         max_age_seconds = max_age_hours * 3600
         current_time = time.time()
         
-        for file_path in cache_path.glob('*'):
-            if file_path.is_file():
-                file_age = current_time - file_path.stat().st_mtime
+        # scandir一次拿到目录项和stat信息，不再对每个文件重复stat
+        with os.scandir(cache_path) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                file_age = current_time - entry.stat().st_mtime
                 if file_age > max_age_seconds:
                     try:
-                        file_path.unlink()
+                        os.unlink(entry.path)
                         cleaned_count += 1
-                        self.logger.debug(f"清理缓存文件: {file_path.name}")
+                        self.logger.debug(f"清理缓存文件: {entry.name}")
                     except Exception as e:
-                        self.logger.error(f"清理文件失败 {file_path}: {str(e)}")
+                        self.logger.error(f"清理文件失败 {entry.path}: {str(e)}")
         
         if cleaned_count > 0:
             self.logger.info(f"缓存清理完成，清理了 {cleaned_count} 个文件")
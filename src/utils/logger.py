@@ -3,6 +3,7 @@
 """
 
 import sys
+import threading
 from pathlib import Path
 from loguru import logger
 from typing import Optional
@@ -20,7 +21,10 @@ class Logger:
         
         # 移除默认处理器
         logger.remove()
-        
+
+        # auth.log延迟注册（见get_auth_logger）
+        self._auth_sink_ready = False
+
         # 设置日志配置
         self._setup_logger()
     
@@ -36,6 +40,8 @@ class Logger:
         )
         
         # 详细日志文件 - 记录所有级别
+        # enqueue=True让格式化和写盘在后台线程完成，不阻塞业务调用；
+        # 文件sink关掉diagnose/backtrace，异常时不做重量级变量美化
         logger.add(
             self.log_dir / f"{self.app_name}.log",
             format=Constants.LogConstants.DEFAULT_FORMAT,
@@ -43,9 +49,12 @@ class Logger:
             rotation=Constants.LogConstants.LOG_ROTATION,
             retention=Constants.LogConstants.LOG_RETENTION,
             compression="zip",
-            encoding="utf-8"
+            encoding="utf-8",
+            enqueue=True,
+            backtrace=False,
+            diagnose=False
         )
-        
+
         # 错误日志文件 - 只记录ERROR及以上级别
         logger.add(
             self.log_dir / f"{self.app_name}_error.log",
@@ -54,10 +63,18 @@ class Logger:
             rotation=Constants.LogConstants.LOG_ROTATION,
             retention=Constants.LogConstants.LOG_RETENTION,
             compression="zip",
-            encoding="utf-8"
+            encoding="utf-8",
+            enqueue=True,
+            backtrace=False,
+            diagnose=False
         )
-        
-        # 登录相关日志 - 单独记录
+
+    def _setup_auth_sink(self):
+        """注册登录相关日志sink
+
+        过滤函数对全局每条日志都会执行一次，所以auth.log只在
+        第一次需要认证日志时才挂上，普通流程不付这笔开销。
+        """
         logger.add(
             self.log_dir / "auth.log",
             format=Constants.LogConstants.DEFAULT_FORMAT,
@@ -65,9 +82,13 @@ class Logger:
             rotation="1 day",
             retention="7 days",
             filter=lambda record: "auth" in record["extra"],
-            encoding="utf-8"
+            encoding="utf-8",
+            enqueue=True,
+            backtrace=False,
+            diagnose=False
         )
-    
+        self._auth_sink_ready = True
+
     def get_logger(self, name: Optional[str] = None):
         """获取logger实例"""
         if name:
@@ -76,21 +97,33 @@ class Logger:
     
     def get_auth_logger(self):
         """获取认证专用logger"""
+        if not self._auth_sink_ready:
+            self._setup_auth_sink()
         return logger.bind(auth=True, name="AUTH")
 
 # 全局logger实例
 _logger_instance = None
+_logger_lock = threading.Lock()
 
-def get_logger(name: Optional[str] = None):
-    """获取全局logger实例"""
+def _get_instance() -> Logger:
+    """获取全局Logger单例（双重检查加锁，防止并发启动时重复挂sink）"""
     global _logger_instance
     if _logger_instance is None:
-        _logger_instance = Logger()
-    return _logger_instance.get_logger(name)
+        with _logger_lock:
+            if _logger_instance is None:
+                _logger_instance = Logger()
+    return _logger_instance
+
+def get_logger(name: Optional[str] = None):
+    """获取全局logger实例"""
+    return _get_instance().get_logger(name)
 
 def get_auth_logger():
     """获取认证专用logger"""
-    global _logger_instance
-    if _logger_instance is None:
-        _logger_instance = Logger()
-    return _logger_instance.get_auth_logger() 
\ No newline at end of file
+    instance = _get_instance()
+    # auth sink的延迟注册同样要防并发重复添加
+    if not instance._auth_sink_ready:
+        with _logger_lock:
+            if not instance._auth_sink_ready:
+                instance._setup_auth_sink()
+    return instance.get_auth_logger()
\ No newline at end of file